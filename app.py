@@ -1,22 +1,57 @@
 import os
 import io
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import shutil
+import tempfile
+import time
+import uuid
+import atexit
+import re
+import itertools
+import hashlib
+import threading
+import queue
+import importlib.util
+import logging
+import traceback
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, g, has_request_context, abort
+from flask.json.provider import JSONProvider
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
+from sqlalchemy import delete, event, exists, func, inspect, literal_column, select, text, tuple_, update
+from sqlalchemy.orm import Session, joinedload
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from models import db, User, Photo, Like, Comment, Save
-from textblob import TextBlob
-from PIL import Image, ImageStat
+# Pillow ke internal block allocator ko chhota rakho taake workers memory na pakde rahein.
+# Pillow khud pehli upload par import hota hai (worker cold start tez rehta hai).
+os.environ.setdefault('PILLOW_BLOCK_SIZE', '1m')
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 # --- AZURE STORAGE LIBRARY ---
-from azure.storage.blob import BlobServiceClient
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient, ContentSettings
+import requests
+from requests.adapters import HTTPAdapter
 
 # .env file se variables load karne ke liye
 load_dotenv()
 
+class OrjsonProvider(JSONProvider):
+    """jsonify() ke liye orjson (C encoder); like/save/comment endpoints sab se zyada hit hote hain."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'mysupersecretkeyIsVeryLongAndSecure')
 
 # --- DATABASE CONFIGURATION ---
@@ -61,6 +96,9 @@ print(f"Using database: {_mask_db_uri(db_uri)}")
 AZURE_CONNECTION_STRING = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
 AZURE_CONTAINER_NAME = os.getenv('AZURE_CONTAINER_NAME')
 
+# Uploaded photos kabhi badalte nahi, browsers/CDN (Front Door) saal bhar cache kar sakte hain
+JPEG_CONTENT_SETTINGS = ContentSettings(content_type='image/jpeg', cache_control='public, max-age=31536000, immutable')
+
 # Local uploads fallback (set LOCAL_UPLOADS=0 to disable)
 LOCAL_UPLOADS = os.getenv('LOCAL_UPLOADS', '1').lower() in ('1', 'true', 'yes')
 LOCAL_UPLOAD_FOLDER = os.path.join(app.root_path, 'static', 'uploads')
@@ -70,10 +108,27 @@ except Exception:
     pass
 
 # Azure Client Initialize (may be None if not configured)
+# Ek hi requests.Session (keep-alive) aur ek hi ContainerClient saari uploads ke liye.
+# Default adapter sirf 10 connections pool karta hai; upload threads x max_concurrency us se zyada hain.
+AZURE_POOL_SIZE = 32
 blob_service_client = None
+container_client = None
 if AZURE_CONNECTION_STRING:
     try:
-        blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
+        blob_session = requests.Session()
+        blob_adapter = HTTPAdapter(pool_connections=AZURE_POOL_SIZE, pool_maxsize=AZURE_POOL_SIZE)
+        blob_session.mount('https://', blob_adapter)
+        blob_session.mount('http://', blob_adapter)
+        blob_service_client = BlobServiceClient.from_connection_string(
+            AZURE_CONNECTION_STRING,
+            transport=RequestsTransport(session=blob_session, session_owner=False,
+                                        connection_timeout=5, read_timeout=60),
+            # Exponential backoff (storage SDK default policy) with explicit limits
+            retry_total=5, retry_connect=3,
+            # >256 KiB blocks trigger high-throughput block blob ingestion
+            max_block_size=8 * 1024 * 1024, max_single_put_size=8 * 1024 * 1024)
+        if AZURE_CONTAINER_NAME:
+            container_client = blob_service_client.get_container_client(AZURE_CONTAINER_NAME)
     except Exception as e:
         print(f"Azure Storage Connection Error: {e}")
 else:
@@ -83,10 +138,103 @@ else:
 # Initialize database extension
 db.init_app(app)
 
+# --- N+1 DETECTION (DEVELOPMENT) ---
+# FLASK_DEBUG=1 par ek request mein same relationship ka dusra lazy load file:line ke saath
+# warning log karta hai; NPLUSONE_RAISE=1 par exception (CI is se query regressions pakadta hai)
+NPLUSONE_RAISE = os.getenv('NPLUSONE_RAISE', '0').lower() in ('1', 'true', 'yes')
+nplusone_logger = logging.getLogger('nplusone')
+
+class NPlusOneError(Exception):
+    pass
+
+def _caller_location():
+    # Sabse andar wala frame jo app ke code/templates mein ho (SQLAlchemy/Jinja internals nahi)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(app.root_path) and 'site-packages' not in frame.filename:
+            return f"{os.path.relpath(frame.filename, app.root_path)}:{frame.lineno}"
+    return '?'
+
+def _detect_lazy_load(orm_execute_state):
+    if not orm_execute_state.is_select or not has_request_context():
+        return
+    parent = orm_execute_state.lazy_loaded_from
+    if parent is None:
+        return
+    key = (parent.class_.__name__, orm_execute_state.bind_mapper.class_.__name__)
+    seen = g.setdefault('lazy_loads', set())
+    if key not in seen:
+        seen.add(key)
+        return
+    message = f"N+1 lazy load {key[0]} -> {key[1]} at {_caller_location()} ({request.endpoint})"
+    if NPLUSONE_RAISE:
+        raise NPlusOneError(message)
+    nplusone_logger.warning(message)
+
+if app.debug:
+    event.listen(Session, 'do_orm_execute', _detect_lazy_load)
+
 # --- AUTO-CREATE TABLES ON STARTUP ---
+# create_all() existing tables mein naye columns add nahi karta, isliye yahan list rakhi hai:
+# (table, column, column DDL, backfill SQL)
+COLUMN_UPGRADES = [
+    ('photo', 'like_count', 'INTEGER NOT NULL DEFAULT 0',
+     'UPDATE photo SET like_count = (SELECT COUNT(*) FROM likes WHERE likes.photo_id = photo.id)'),
+    ('photo', 'status', "VARCHAR(20) NOT NULL DEFAULT 'ready'", None),
+    ('photo', 'content_hash', 'VARCHAR(32)', None),
+    ('photo', 'save_count', 'INTEGER NOT NULL DEFAULT 0',
+     'UPDATE photo SET save_count = (SELECT COUNT(*) FROM saves WHERE saves.photo_id = photo.id)'),
+    ('photo', 'comment_count', 'INTEGER NOT NULL DEFAULT 0',
+     'UPDATE photo SET comment_count = (SELECT COUNT(*) FROM comment WHERE comment.photo_id = photo.id)'),
+]
+
+# PostgreSQL-only search index: title/caption/location ka generated tsvector + GIN index.
+# SQLite par ye skip hota hai aur feed search ILIKE par chalti hai.
+POSTGRES_UPGRADES = [
+    "ALTER TABLE photo ADD COLUMN IF NOT EXISTS search_vec tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(caption, '') || ' ' || coalesce(location, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_photo_search_vec ON photo USING GIN (search_vec)",
+    # Username search ILIKE '%q%' hi rehti hai; trigram GIN index usse index-backed banata hai.
+    # Azure Flexible Server par pg_trgm ko pehle azure.extensions mein allow karna padta hai.
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS ix_user_username_trgm ON "user" USING GIN (username gin_trgm_ops)',
+]
+
+# Set at startup: True when photo.search_vec exists (PostgreSQL full-text search)
+FULLTEXT_SEARCH = False
+
+def upgrade_schema():
+    global FULLTEXT_SEARCH
+    inspector = inspect(db.engine)
+    for table, column, ddl, backfill in COLUMN_UPGRADES:
+        existing = {c['name'] for c in inspector.get_columns(table)}
+        if column in existing:
+            continue
+        db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+        if backfill:
+            db.session.execute(text(backfill))
+        db.session.commit()
+        print(f"Added column {table}.{column}")
+
+    # create_all() existing tables par naye indexes bhi nahi banata
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+    if db.engine.dialect.name == 'postgresql':
+        for statement in POSTGRES_UPGRADES:
+            try:
+                db.session.execute(text(statement))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"PostgreSQL upgrade skipped ({statement[:40]}...): {e}")
+        columns = {c['name'] for c in inspect(db.engine).get_columns('photo')}
+        FULLTEXT_SEARCH = 'search_vec' in columns
+
 with app.app_context():
     try:
         db.create_all()
+        upgrade_schema()
         print("Database tables checked/created successfully!")
     except Exception as e:
         print(f"Error creating database tables: {e}")
@@ -95,46 +243,117 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Har request par user ka SELECT na ho: detached copy cache karo aur session mein bina
+# query ke merge karo. Cache har process ka apna hai, is liye entries USER_CACHE_TTL seconds
+# baad expire hoti hain (doosre gunicorn workers/instances bhi itni der mein naya data dekhte hain);
+# User row badalne wale routes apne process mein sirf us user ki entry evict karte hain.
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+_user_cache = TTLCache(maxsize=1024, ttl=USER_CACHE_TTL)
+_user_cache_lock = threading.Lock()
+
+def _cached_user(user_id):
+    with _user_cache_lock:
+        user = _user_cache.get(user_id)
+    if user is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        db.session.expunge(user)
+        with _user_cache_lock:
+            _user_cache[user_id] = user
+    return user
+
+def evict_cached_user(user_id):
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user = _cached_user(int(user_id))
+    if user is None:
+        return None
+    return db.session.merge(user, load=False)
+
+# --- PASSWORD HASHING ---
+# Naye passwords argon2id (C implementation) se hash hote hain. Purane werkzeug scrypt/pbkdf2
+# hashes login par verify hote hain aur wahin argon2 mein re-hash ho jaate hain.
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+def verify_password(user, password):
+    """Password check karo; hash purana/weak ho to user.password update karo (commit caller ka kaam)."""
+    if user.password.startswith('$argon2'):
+        try:
+            password_hasher.verify(user.password, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        if password_hasher.check_needs_rehash(user.password):
+            user.password = hash_password(password)
+        return True
+    if not check_password_hash(user.password, password):
+        return False
+    user.password = hash_password(password)
+    return True
+
+# Photos per feed page
+FEED_PAGE_SIZE = 20
+
+# Ek request ke saare timeago filters same "now" use karte hain
+@app.before_request
+def set_request_time():
+    g.now = datetime.utcnow()
+
+# Local uploads bhi immutable hain: browser saal bhar revalidate na kare (Flask static ETag deta hai)
+UPLOAD_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+@app.after_request
+def cache_uploads(response):
+    if request.path.startswith('/static/uploads/') and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = UPLOAD_CACHE_CONTROL
+    return response
 
 # --- FILTERS ---
 @app.template_filter('timeago')
 def timeago(date):
-    now = datetime.utcnow()
+    now = g.get('now') or datetime.utcnow()
     diff = now - date
-    seconds = diff.total_seconds()
+    seconds = diff.days * 86400 + diff.seconds
     if seconds < 60: return "Just now"
     minutes = seconds // 60
-    if minutes < 60: return f"{int(minutes)}m ago"
+    if minutes < 60: return f"{minutes}m ago"
     hours = minutes // 60
-    if hours < 24: return f"{int(hours)}h ago"
+    if hours < 24: return f"{hours}h ago"
     days = hours // 24
-    return f"{int(days)}d ago"
+    return f"{days}d ago"
 
 # --- AI IMAGE ANALYSIS ---
-def analyze_image(img_obj):
+# ITU-R 601 luma weights (Pillow ki convert('L') wale), RGB channel means par lagte hain
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+def analyze_image(img_obj, size=None):
+    # size: original dimensions, jab img_obj draft/thumbnail se chhota ho chuka ho
+    from PIL import Image, ImageStat
     tags = []
     try:
-        if img_obj.mode != 'RGB': img_obj = img_obj.convert('RGB')
-        
-        # Quality Analysis
-        width, height = img_obj.size
+        # Quality Analysis (original resolution se)
+        width, height = size or img_obj.size
         if width * height > 1000000: tags.append("HD ᴴᴰ")
         else: tags.append("SD")
 
-        # Brightness Analysis
-        stat = ImageStat.Stat(img_obj.convert('L'))
-        brightness = stat.mean[0]
+        # Baaki stats sirf averages hain, chhoti copy par bhi same aate hain
+        small = img_obj.copy()
+        small.thumbnail((256, 256), Image.Resampling.BILINEAR)
+        if small.mode != 'RGB': small = small.convert('RGB')
+
+        # Brightness + Color Analysis: ek hi C histogram pass se channel means
+        r, g, b = ImageStat.Stat(small).mean
+        brightness = sum(w * c for w, c in zip(LUMA_WEIGHTS, (r, g, b)))
         if brightness > 150: tags.append("Bright ☀️")
         elif brightness < 80: tags.append("Dark 🌙")
         else: tags.append("Neutral Lighting ☁️")
 
-        # Color Analysis
-        img_small = img_obj.resize((1, 1))
-        color = img_small.getpixel((0, 0))
-        r, g, b = color
         if r > g and r > b: tags.append("Warm Tone 🔴")
         elif b > r and b > g: tags.append("Cool Tone 🔵")
         else: tags.append("Balanced Color 🎨")
@@ -144,6 +363,377 @@ def analyze_image(img_obj):
         return "Not Analyzed"
     return " | ".join(tags)
 
+# --- AI COMMENT SENTIMENT ---
+# TextBlob ka adjective lexicon startup par ek dafa dict mein load hota hai;
+# per-comment scoring sirf dict lookups hain (TextBlob/NLTK pipeline nahi chalti)
+SENTIMENT_NEGATIONS = {'no', 'not', "n't", 'never'}
+# Pattern/TextBlob ki emoticon table: emoticon -> polarity (lexicon XML mein nahi hain)
+SENTIMENT_EMOTICONS = {
+    e: polarity for polarity, emoticons in (
+        (1.0, ('<3', '♥', '>:D', ':-D', ':D', '=-D', '=D', 'X-D', 'x-D', '8-D')),
+        (0.75, ('>:P', ':-P', ':P', ':-p', ':p', ':-b', ':b', ':c)', ':o)', ':^)')),
+        (0.5, ('>:)', ':-)', ':)', '=)', '=]', ':]', ':}', ':>', ':3', '8)', '8-)')),
+        (0.25, ('>;]', ';-)', ';)', ';-]', ';]', ';D', ';^)', '*-)', '*)')),
+        (0.05, ('>:o', ':-O', ':O', ':o', ':-o', 'o_O', 'o.O', '°O°', '°o°')),
+        (-0.25, ('>:/', ':-/', ':/', ':\\', '>:\\', ':-.', ':-s', ':s', ':S', ':-S', '>.>')),
+        (-0.75, ('>:[', ':-(', ':(', '=(', ':-[', ':[', ':{', ':-<', ':c', ':-c', '=/')),
+        (-1.0, (":'(", ":'''(", ";'(")),
+    ) for e in emoticons
+}
+# Hyphenated/alphanumeric lexicon words ("open-minded", "2nd", "f*cking") ek token rehte hain
+SENTIMENT_TOKEN = re.compile(r"n't|[a-z0-9]+(?:[-*][a-z0-9]+)*|!")
+
+def sentiment_tokens(text):
+    """TextBlob ke tokenizer jaisa: emoticons (case-sensitive, ":D" haan ":d" nahi) whitespace-separated
+    tokens hain, baaki lowercase words aur "!"."""
+    for chunk in text.replace("n't", " n't").split():
+        if chunk in SENTIMENT_EMOTICONS:
+            yield chunk
+        else:
+            yield from SENTIMENT_TOKEN.findall(chunk.lower())
+
+def load_sentiment_lexicon():
+    spec = importlib.util.find_spec('textblob')
+    path = os.path.join(os.path.dirname(spec.origin), 'en', 'en-sentiment.xml')
+    senses = {}
+    for node in ElementTree.parse(path).getroot().iter('word'):
+        word = node.get('form')
+        if not word:
+            continue
+        scores = (float(node.get('polarity', 0.0)), float(node.get('intensity', 1.0)))
+        senses.setdefault(word, {}).setdefault(node.get('pos'), []).append(scores)
+    lexicon, adverbs = {}, {}
+    for word, by_pos in senses.items():
+        # Average per part-of-speech, then across parts-of-speech (same as TextBlob)
+        per_pos = {pos: [sum(col) / len(col) for col in zip(*scores)] for pos, scores in by_pos.items()}
+        polarity, intensity = [sum(col) / len(col) for col in zip(*per_pos.values())]
+        lexicon[word] = (polarity, intensity, 'RB' in by_pos)
+        # TextBlob "terrible" ka score adverb "terribly" par bhi lagata hai
+        if 'JJ' in per_pos:
+            stem = word[:-1] + 'i' if word.endswith('y') else word
+            stem = stem[:-2] if stem.endswith('le') else stem
+            adverbs[stem + 'ly'] = (*per_pos['JJ'], True)
+    lexicon.update(adverbs)
+    return lexicon
+
+# Lexicon startup par background thread mein load hota hai (import/worker boot block nahi hota);
+# agar pehla comment us se pehle aa jaye to wahi thread-safe load karta hai
+_sentiment_lexicon = None
+_sentiment_lexicon_lock = threading.Lock()
+
+def get_sentiment_lexicon():
+    global _sentiment_lexicon
+    if _sentiment_lexicon is None:
+        with _sentiment_lexicon_lock:
+            if _sentiment_lexicon is None:
+                _sentiment_lexicon = load_sentiment_lexicon()
+    return _sentiment_lexicon
+
+threading.Thread(target=get_sentiment_lexicon, name='sentiment-warmup', daemon=True).start()
+
+def comment_polarity(text):
+    """Polarity in [-1, 1], TextBlob ke PatternAnalyzer jaisa: adverbs agle word ko
+    intensify karte hain, negation ("not good") polarity ko -0.5 se multiply karta hai."""
+    lexicon = get_sentiment_lexicon()
+    hits = []  # [polarity, negated, intensity]; intensity agle modified word par lagti hai
+    modifier = None  # preceding adverb (word)
+    negated = False
+    for token in sentiment_tokens(text):
+        entry = lexicon.get(token)
+        if entry:
+            polarity, intensity, is_modifier = entry
+            if modifier is None:
+                hits.append([polarity, False, intensity])
+            else:
+                hits[-1][0] = max(-1.0, min(polarity * hits[-1][2], 1.0))
+                hits[-1][2] = intensity
+            if negated:
+                hits[-1][1] = True
+                # "not very good": negated adverb intensify ki jagah soften karta hai
+                hits[-1][2] = 1.0 / hits[-1][2] if hits[-1][2] else hits[-1][2]
+            modifier = token if is_modifier else None
+            negated = token in SENTIMENT_NEGATIONS
+            continue
+        if token in SENTIMENT_NEGATIONS:
+            negated = True
+        elif negated and len(token.strip("'")) > 1:
+            negated = False
+        if negated and modifier is not None and modifier.endswith('ly'):
+            # "really not good": negation adverb wale hit par lagti hai
+            hits[-1][1] = True
+            negated = False
+        elif modifier is not None and len(token) > 2:
+            modifier = None
+        if token == '!' and hits:
+            hits[-1][0] = max(-1.0, min(hits[-1][0] * 1.25, 1.0))
+        if token in SENTIMENT_EMOTICONS:
+            # Emoticon apna hit hai (intensity 1.0); chhote emoticon ke baad modifier zinda rehta hai
+            hits.append([SENTIMENT_EMOTICONS[token], False, 1.0])
+    if not hits:
+        return 0.0
+    return sum(p * -0.5 if neg else p for p, neg, _ in hits) / len(hits)
+
+# --- WRITE-BEHIND QUEUE (LIKES / SAVES) ---
+# Like/save toggles request mein commit nahi hote: (kind, user_id, photo_id, state) queue mein jata hai
+# aur ek background thread har WRITE_BEHIND_INTERVAL mein poora batch ek transaction mein likhta hai.
+# Jab tak write flush na ho, _pending_writes us (user, photo) ki nayi state yaad rakhta hai taake
+# agla toggle purani DB state par decide na kare. like_count kuch milliseconds stale ho sakta hai.
+# Batch fail ho to har row apni transaction mein, backoff ke saath WRITE_RETRIES dafa try hoti hai.
+WRITE_BEHIND_INTERVAL = 0.05
+WRITE_RETRIES = 3
+WRITE_RETRY_BACKOFF = 0.2
+_WRITE_STOP = None  # queue sentinel: worker baaki batch likh kar band ho jata hai
+WRITE_MODELS = {'like': Like, 'save': Save}
+_write_queue = queue.Queue()
+_write_thread = None
+_write_thread_lock = threading.Lock()
+_write_seq = itertools.count()
+_pending_writes = {}  # (kind, user_id, photo_id) -> (seq, state)
+_pending_lock = threading.Lock()
+
+def pending_state(kind, user_id, photo_id):
+    """Queued (abhi flush nahi hui) state, ya None agar koi write pending nahi."""
+    with _pending_lock:
+        pending = _pending_writes.get((kind, user_id, photo_id))
+    return None if pending is None else pending[1]
+
+def stored_exists(kind, user_id, photo_id):
+    """Committed like/save row ka EXISTS clause."""
+    model = WRITE_MODELS[kind]
+    return exists().where(model.user_id == user_id, model.photo_id == photo_id)
+
+def current_state(kind, user_id, photo_id):
+    """True agar user ne photo like/save ki hui hai (queued writes samet)."""
+    pending = pending_state(kind, user_id, photo_id)
+    if pending is not None:
+        return pending
+    return db.session.query(stored_exists(kind, user_id, photo_id)).scalar()
+
+def enqueue_write(kind, user_id, photo_id, state):
+    global _write_thread
+    if _write_thread is None or not _write_thread.is_alive():
+        with _write_thread_lock:
+            if _write_thread is None or not _write_thread.is_alive():
+                _write_thread = threading.Thread(target=_write_worker, name='write-behind', daemon=True)
+                _write_thread.start()
+    with _pending_lock:
+        seq = next(_write_seq)
+        _pending_writes[(kind, user_id, photo_id)] = (seq, state)
+    _write_queue.put((seq, kind, user_id, photo_id, state))
+
+def _drain_write_queue():
+    batch = []
+    while True:
+        try:
+            batch.append(_write_queue.get_nowait())
+        except queue.Empty:
+            return batch
+
+def _write_statements(kind, user_id, photo_id, state):
+    """Ek toggle ke SQL statements. PostgreSQL par row change aur like_count/save_count update
+    ek hi statement hain (DML CTE); SQLite par do statements, counter affected rowcount se."""
+    model = WRITE_MODELS[kind]
+    counter = getattr(Photo, f'{kind}_count')
+    postgres = db.engine.dialect.name == 'postgresql'
+    if postgres:
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    if state:
+        change = insert(model).values(user_id=user_id, photo_id=photo_id, timestamp=datetime.utcnow()) \
+            .on_conflict_do_nothing()
+    else:
+        change = delete(model).where(model.user_id == user_id, model.photo_id == photo_id)
+    sign = 1 if state else -1
+    if postgres:
+        changed = change.returning(model.photo_id).cte('changed')
+        changed_count = select(func.count()).select_from(changed).scalar_subquery()
+        return update(Photo).where(Photo.id == photo_id) \
+            .values({counter: counter + sign * changed_count}).add_cte(changed), None
+    return change, (counter, sign)
+
+def flush_writes(batch):
+    for seq, kind, user_id, photo_id, state in batch:
+        statement, fallback = _write_statements(kind, user_id, photo_id, state)
+        result = db.session.execute(statement)
+        # SQLite: counter sirf tab badlo jab row sach mein insert/delete hui ho
+        if fallback and result.rowcount:
+            counter, sign = fallback
+            db.session.execute(update(Photo).where(Photo.id == photo_id)
+                               .values({counter: counter + sign * result.rowcount}))
+    db.session.commit()
+
+def _clear_pending(batch):
+    with _pending_lock:
+        for seq, kind, user_id, photo_id, state in batch:
+            key = (kind, user_id, photo_id)
+            if _pending_writes.get(key, (None,))[0] == seq:
+                del _pending_writes[key]
+
+def _write_batch(batch):
+    """Batch ek transaction mein; fail ho to har row alag transaction mein retry karo
+    taake ek kharab row baaki users ke likes/saves na le doobe."""
+    try:
+        flush_writes(batch)
+        _clear_pending(batch)
+        return
+    except Exception as e:
+        db.session.rollback()
+        print(f"Write-behind batch flush failed ({len(batch)} writes), retrying per row: {e}")
+    for item in batch:
+        for attempt in range(WRITE_RETRIES):
+            try:
+                flush_writes([item])
+                break
+            except Exception as e:
+                db.session.rollback()
+                if attempt + 1 == WRITE_RETRIES:
+                    print(f"Write-behind write dropped after {WRITE_RETRIES} attempts {item[1:]}: {e}")
+                else:
+                    time.sleep(WRITE_RETRY_BACKOFF * 2 ** attempt)
+        _clear_pending([item])
+
+def _write_worker():
+    stopping = False
+    while not stopping:
+        batch = [_write_queue.get()]
+        if batch[0] is not _WRITE_STOP:
+            time.sleep(WRITE_BEHIND_INTERVAL)
+        batch += _drain_write_queue()
+        stopping = _WRITE_STOP in batch
+        batch = [item for item in batch if item is not _WRITE_STOP]
+        if batch:
+            with app.app_context():
+                _write_batch(batch)
+
+@atexit.register
+def _flush_pending_writes():
+    # Worker ke haath mein jo batch hai woh bhi likha jaye: usse stop karke join karo
+    if _write_thread is not None and _write_thread.is_alive():
+        _write_queue.put(_WRITE_STOP)
+        _write_thread.join(timeout=30)
+        return
+    batch = _drain_write_queue()
+    if batch:
+        with app.app_context():
+            _write_batch(batch)
+
+# --- BACKGROUND UPLOAD PROCESSING ---
+# Upload request sirf raw file temp path par likh kar 'processing' row banata hai;
+# decode, analysis, resize, encode aur storage yahan worker threads mein hote hain.
+upload_executor = ThreadPoolExecutor(max_workers=int(os.getenv('UPLOAD_WORKERS', '2')),
+                                     thread_name_prefix='upload')
+
+def file_digest(path):
+    """Upload ki BLAKE2b content hash (analysis cache key)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def new_blob_name(filename):
+    """Collision-free naam: random uuid4 hex, aur uske pehle 3 hex chars prefix taake
+    Azure blob partitions par load barabar bate (timestamp prefix sab ek partition par jata hai)."""
+    h = uuid.uuid4().hex
+    return f"{h[:3]}/{h}_{filename}"
+
+# Pillow info keys jin mein location/device metadata ho sakta hai (public URL par nahi jana chahiye)
+PRIVATE_METADATA_KEYS = ('exif', 'xmp', 'photoshop')
+
+def store_image(tmp_path, blob_name, auto_tags=None):
+    """Image process karke Azure/local storage mein rakho aur auto_tags return karo.
+    auto_tags pehle se maloom hon (same content pehle analyze ho chuka) to analysis skip."""
+    from PIL import Image
+    with Image.open(tmp_path) as img:
+        original_size = img.size
+        # Already a JPEG within 1080px: store the uploaded bytes as-is, no re-encode.
+        # EXIF/XMP/IPTC (GPS location, camera info) wali files re-encode hoti hain taake metadata strip ho.
+        # CMYK/YCCK JPEGs bhi re-encode hote hain taake browser-safe RGB store ho.
+        passthrough = (img.format == 'JPEG' and max(original_size) <= 1080 and img.mode in ('RGB', 'L')
+                       and not any(img.info.get(key) for key in PRIVATE_METADATA_KEYS))
+        # JPEG ko decode karte waqt hi DCT scaling (1/2, 1/4, 1/8) se chhota kar lo
+        if img.format == 'JPEG':
+            img.draft('RGB', (1080, 1080))
+        if img.mode != 'RGB': img = img.convert('RGB')
+
+        # Pehle 1080px thumbnail, phir analysis usi chhoti image par (full-res nahi).
+        # Draft ke baad image target ke 2x se kam hai, is liye LANCZOS sasta hai.
+        if not passthrough:
+            img.thumbnail((1080, 1080), Image.Resampling.LANCZOS)
+        if auto_tags is None:
+            auto_tags = analyze_image(img, size=original_size)
+
+        # Prefer Azure if configured, otherwise use local static/uploads
+        if passthrough:
+            if container_client:
+                # Length pehle se dene par SDK size nikalne ke liye stream buffer nahi karta
+                with open(tmp_path, 'rb') as raw:
+                    container_client.upload_blob(name=blob_name, data=raw, overwrite=True,
+                                                 length=os.path.getsize(tmp_path), max_concurrency=4,
+                                                 content_settings=JPEG_CONTENT_SETTINGS)
+            else:
+                shutil.copyfile(tmp_path, os.path.join(LOCAL_UPLOAD_FOLDER, blob_name))
+        else:
+            # Ek hi encode in-memory buffer mein; baseline JPEG, optimize off (extra Huffman pass nahi)
+            in_mem_file = io.BytesIO()
+            img.save(in_mem_file, format='JPEG', quality=85, optimize=False, progressive=False)
+            if container_client:
+                # bytes + length: SDK single-shot PUT karta hai (memoryview SDK ko iterable lagta hai)
+                data = in_mem_file.getvalue()
+                container_client.upload_blob(name=blob_name, data=data, overwrite=True, length=len(data),
+                                             max_concurrency=4, content_settings=JPEG_CONTENT_SETTINGS)
+            else:
+                with open(os.path.join(LOCAL_UPLOAD_FOLDER, blob_name), 'wb') as out:
+                    out.write(in_mem_file.getbuffer())
+
+        # Decoded pixel buffer foran free karo, worker ke paas na atka rahe
+        img.close()
+        del img
+    return auto_tags
+
+def process_upload(photo_id, tmp_path, blob_name):
+    with app.app_context():
+        photo = db.session.get(Photo, photo_id)
+        try:
+            # Same file pehle upload ho chuki ho (retry/re-upload) to uske tags reuse karo
+            photo.content_hash = file_digest(tmp_path)
+            cached_tags = db.session.query(Photo.auto_tags).filter(
+                Photo.content_hash == photo.content_hash, Photo.status == 'ready',
+                Photo.auto_tags.isnot(None)).limit(1).scalar()
+            photo.auto_tags = store_image(tmp_path, blob_name, auto_tags=cached_tags)
+            photo.status = 'ready'
+        except Exception as e:
+            print(f"Upload processing failed for photo {photo_id}: {e}")
+            photo.status = 'failed'
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        db.session.commit()
+
+# Worker/process restart par 'processing' rows ke temp files (aur queued jobs) kho jaate hain.
+# Startup par itni purani processing rows 'failed' ho jati hain taake hamesha spinner na dikhe.
+STALE_UPLOAD_MINUTES = int(os.getenv('STALE_UPLOAD_MINUTES', '15'))
+
+def fail_stale_uploads():
+    cutoff = datetime.utcnow() - timedelta(minutes=STALE_UPLOAD_MINUTES)
+    result = db.session.execute(update(Photo)
+                                .where(Photo.status == 'processing', Photo.uploaded_at < cutoff)
+                                .values(status='failed'))
+    db.session.commit()
+    return result.rowcount
+
+with app.app_context():
+    try:
+        stale = fail_stale_uploads()
+        if stale:
+            print(f"Marked {stale} stale processing uploads as failed")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Stale upload check failed: {e}")
+
 # --- ROUTES ---
 
 @app.route('/')
@@ -155,26 +745,72 @@ def home():
 @login_required
 def feed():
     query = request.args.get('q')
+    before_id = request.args.get('before_id', type=int)
+    before_ts = request.args.get('before_ts', type=datetime.fromisoformat)
+    photos_query = Photo.query.options(joinedload(Photo.creator)).filter(Photo.status == 'ready')
     if query:
         search_term = f"%{query}%"
-        photos = Photo.query.join(User).filter(
-            (Photo.title.ilike(search_term)) | 
-            (Photo.caption.ilike(search_term)) | 
-            (Photo.location.ilike(search_term)) |
+        if FULLTEXT_SEARCH:
+            # GIN index wala tsvector match, 3 ILIKE columns ka sequential scan nahi
+            photo_match = literal_column('photo.search_vec').op('@@')(func.plainto_tsquery('simple', query))
+        else:
+            photo_match = (Photo.title.ilike(search_term)) | \
+                          (Photo.caption.ilike(search_term)) | \
+                          (Photo.location.ilike(search_term))
+        photos_query = photos_query.join(User).filter(
+            photo_match |
             (User.username.ilike(search_term))
-        ).order_by(Photo.uploaded_at.desc()).all()
-    else:
-        photos = Photo.query.order_by(Photo.uploaded_at.desc()).all()
-    return render_template('feed.html', photos=photos)
+        )
+    # Keyset pagination: agla page pichhle page ki aakhri (uploaded_at, id) se shuru hota hai
+    if before_id and before_ts:
+        photos_query = photos_query.filter(tuple_(Photo.uploaded_at, Photo.id) < tuple_(before_ts, before_id))
+    photos = photos_query.order_by(Photo.uploaded_at.desc(), Photo.id.desc()).limit(FEED_PAGE_SIZE).all()
+    next_cursor = None
+    if len(photos) == FEED_PAGE_SIZE:
+        next_cursor = {'before_ts': photos[-1].uploaded_at.isoformat(), 'before_id': photos[-1].id}
+
+    # Poore page ke comments aur current user ke likes/saves ek-ek query mein,
+    # template har photo ke liye alag SELECT na kare
+    photo_ids = [p.id for p in photos]
+    comments_by_photo = {}
+    liked_ids, saved_ids = set(), set()
+    if photo_ids:
+        comments = Comment.query.options(joinedload(Comment.user)) \
+            .filter(Comment.photo_id.in_(photo_ids)).order_by(Comment.id).all()
+        for comment in comments:
+            comments_by_photo.setdefault(comment.photo_id, []).append(comment)
+        if current_user.role == 'consumer':
+            liked_ids = {pid for (pid,) in db.session.query(Like.photo_id).filter(
+                Like.user_id == current_user.id, Like.photo_id.in_(photo_ids))}
+            saved_ids = {pid for (pid,) in db.session.query(Save.photo_id).filter(
+                Save.user_id == current_user.id, Save.photo_id.in_(photo_ids))}
+    return render_template('feed.html', photos=photos, next_cursor=next_cursor, query=query,
+                           comments_by_photo=comments_by_photo, liked_ids=liked_ids, saved_ids=saved_ids)
 
 @app.route('/u/<username>')
 @login_required
 def profile(username):
     user = User.query.filter_by(username=username).first_or_404()
-    photos = Photo.query.filter_by(user_id=user.id).order_by(Photo.uploaded_at.desc()).all()
-    saved_photos = Photo.query.join(Save).filter(Save.user_id == user.id).order_by(Save.timestamp.desc()).all()
-    liked_photos = Photo.query.join(Like).filter(Like.user_id == user.id).order_by(Like.timestamp.desc()).all()
-    return render_template('profile.html', user=user, photos=photos, saved_photos=saved_photos, liked_photos=liked_photos)
+    # Teeno tabs (posts/saved/liked) ek hi round trip: teen indexed branches ka UNION ALL
+    # (ix_photo_user_uploaded, saves/likes ka (user_id, photo_id) PK) tab tag ke saath
+    posts = db.session.query(Photo.id.label('photo_id'), literal_column("'posts'").label('tab'),
+                             Photo.uploaded_at.label('sort_ts')).filter(Photo.user_id == user.id)
+    # Processing/failed uploads sirf owner ko dikhte hain
+    if current_user.id != user.id:
+        posts = posts.filter(Photo.status == 'ready')
+    saved = db.session.query(Save.photo_id, literal_column("'saved'"), Save.timestamp).filter(Save.user_id == user.id)
+    liked = db.session.query(Like.photo_id, literal_column("'liked'"), Like.timestamp).filter(Like.user_id == user.id)
+    tabs = posts.union_all(saved, liked).subquery()
+    rows = (db.session.query(Photo, tabs.c.tab)
+            .join(tabs, tabs.c.photo_id == Photo.id)
+            .order_by(tabs.c.sort_ts.desc().nulls_last())
+            .all())
+    by_tab = {'posts': [], 'saved': [], 'liked': []}
+    for photo, tab in rows:
+        by_tab[tab].append(photo)
+    photos, saved_photos, liked_photos = by_tab['posts'], by_tab['saved'], by_tab['liked']
+    return render_template('profile.html', user=user, photos=photos, saved_photos=saved_photos,
+                           liked_photos=liked_photos)
 
 @app.route('/upload', methods=['GET', 'POST'])
 @login_required
@@ -191,39 +827,37 @@ def creator_dashboard():
         location = request.form.get('location')
         
         if file and title and file.filename != '':
+            from PIL import Image
             filename = secure_filename(file.filename)
+            if not (container_client or LOCAL_UPLOADS):
+                flash('Azure storage is not configured on the server. Uploads are disabled.', 'danger')
+                return render_template('dashboard.html')
             try:
-                img = Image.open(file)
-                if img.mode != 'RGB': img = img.convert('RGB')
+                # Sirf header parse hota hai (pixels decode nahi), taake galat file foran reject ho
+                with Image.open(file):
+                    pass
+                file.stream.seek(0)
 
-                auto_tags = analyze_image(img)
-                img.thumbnail((1080, 1080))
-
-                # Prefer Azure if configured, otherwise use local static/uploads when enabled
-                if blob_service_client and AZURE_CONTAINER_NAME:
-                    in_mem_file = io.BytesIO()
-                    img.save(in_mem_file, format='JPEG', optimize=True, quality=85)
-                    in_mem_file.seek(0)
-
-                    blob_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{filename}"
-                    blob_client = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=blob_name)
-                    blob_client.upload_blob(in_mem_file, overwrite=True)
-                    file_url = blob_client.url
-                elif LOCAL_UPLOADS:
-                    blob_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{filename}"
-                    local_path = os.path.join(LOCAL_UPLOAD_FOLDER, blob_name)
-                    img.save(local_path, format='JPEG', optimize=True, quality=85)
-                    file_url = url_for('static', filename=f'uploads/{blob_name}', _external=True)
+                # Raw upload temp file mein; decode/analysis/storage background worker karega
+                fd, tmp_path = tempfile.mkstemp(prefix='upload_')
+                os.close(fd)
+                file.save(tmp_path)
+
+                # URL abhi se maloom hai, is liye row foran 'processing' status ke saath ban jati hai
+                blob_name = new_blob_name(filename)
+                if container_client:
+                    file_url = container_client.get_blob_client(blob_name).url
                 else:
-                    flash('Azure storage is not configured on the server. Uploads are disabled.', 'danger')
-                    return render_template('dashboard.html')
+                    blob_name = blob_name.split('/', 1)[1]  # local uploads folder flat hai
+                    file_url = url_for('static', filename=f'uploads/{blob_name}', _external=True)
 
                 new_photo = Photo(filename=file_url, title=title, caption=caption, 
                                   location=location, people_present=people, 
-                                  auto_tags=auto_tags, user_id=current_user.id)
+                                  status='processing', user_id=current_user.id)
                 db.session.add(new_photo)
                 db.session.commit()
-                flash('Photo Uploaded successfully!', 'success')
+                upload_executor.submit(process_upload, new_photo.id, tmp_path, blob_name)
+                flash('Photo uploaded! It will appear once processing finishes.', 'success')
                 return redirect(url_for('profile', username=current_user.username))
             except Exception as e:
                 flash(f"Upload Error: {str(e)}", 'danger')
@@ -234,32 +868,26 @@ def creator_dashboard():
 @login_required
 def toggle_like(photo_id):
     if current_user.role == 'creator': return jsonify({'liked': False, 'error': 'Creators cannot like'})
-    photo = Photo.query.get_or_404(photo_id)
-    existing_like = Like.query.filter_by(user_id=current_user.id, photo_id=photo_id).first()
-    liked = False
-    if existing_like:
-        db.session.delete(existing_like)
-    else:
-        new_like = Like(user_id=current_user.id, photo_id=photo_id)
-        db.session.add(new_like)
-        liked = True
-    db.session.commit()
-    return jsonify({'liked': liked, 'count': photo.likes.count()})
+    # Committed like_count aur committed like row ek hi statement se (same snapshot)
+    row = db.session.execute(select(Photo.like_count, stored_exists('like', current_user.id, photo_id))
+                             .where(Photo.id == photo_id)).first()
+    if row is None:
+        abort(404)
+    like_count, db_has_like = row
+    pending = pending_state('like', current_user.id, photo_id)
+    liked = not (db_has_like if pending is None else pending)
+    # Write background worker batch mein karta hai; count optimistic hai. Pending writes abhi
+    # like_count mein nahi, is liye count committed row ke against nikalta hai.
+    enqueue_write('like', current_user.id, photo_id, liked)
+    return jsonify({'liked': liked, 'count': like_count + int(liked) - int(db_has_like)})
 
 @app.route('/save/<int:photo_id>', methods=['POST'])
 @login_required
 def toggle_save(photo_id):
     if current_user.role == 'creator': return jsonify({'saved': False, 'error': 'Creators cannot save'})
-    photo = Photo.query.get_or_404(photo_id)
-    existing_save = Save.query.filter_by(user_id=current_user.id, photo_id=photo_id).first()
-    saved = False
-    if existing_save:
-        db.session.delete(existing_save)
-    else:
-        new_save = Save(user_id=current_user.id, photo_id=photo_id)
-        db.session.add(new_save)
-        saved = True
-    db.session.commit()
+    Photo.query.get_or_404(photo_id)
+    saved = not current_state('save', current_user.id, photo_id)
+    enqueue_write('save', current_user.id, photo_id, saved)
     return jsonify({'saved': saved})
 
 @app.route('/comment/<int:photo_id>', methods=['POST'])
@@ -269,8 +897,7 @@ def add_comment(photo_id):
     text = request.form.get('text')
     if not text: return jsonify({'success': False, 'message': 'Empty comment'})
     
-    analysis = TextBlob(text)
-    score = analysis.sentiment.polarity
+    score = comment_polarity(text)
     if score < -0.3: return jsonify({'success': False, 'message': 'Blocked: Negative content 🚫'})
     
     sentiment_type = "neutral"
@@ -278,7 +905,11 @@ def add_comment(photo_id):
     elif score < 0: text += " [AI: Negative]"; sentiment_type = "negative"
     else: text += " [AI: Neutral]"
     
+    Photo.query.get_or_404(photo_id)
     db.session.add(Comment(text=text, user_id=current_user.id, photo_id=photo_id))
+    # Comment row aur counter ek hi transaction mein
+    db.session.execute(update(Photo).where(Photo.id == photo_id)
+                       .values(comment_count=Photo.comment_count + 1))
     db.session.commit()
     clean_text = text.split('[AI:')[0]
     return jsonify({'success': True, 'username': current_user.username, 'text': clean_text, 'sentiment': sentiment_type})
@@ -301,7 +932,7 @@ def register():
         
         # Naya user selected role ke saath create hoga
         new_user = User(username=username, 
-                        password=generate_password_hash(password), 
+                        password=hash_password(password), 
                         role=role) 
         
         db.session.add(new_user)
@@ -318,7 +949,10 @@ def login():
         password = request.form.get('password')
         role = request.form.get('role')
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password, password):
+        if user and verify_password(user, password):
+            if db.session.is_modified(user):
+                db.session.commit()
+                evict_cached_user(user.id)
             if user.role == role:
                 login_user(user)
                 # Redirect to role-specific page: creators to dashboard, consumers to feed
@@ -342,15 +976,18 @@ def edit_profile():
         # Handle avatar upload if provided
         avatar_file = request.files.get('avatar')
         if avatar_file and avatar_file.filename != '':
+            from PIL import Image
             try:
                 avatar_filename = secure_filename(avatar_file.filename)
                 # create a unique filename per user
-                avatar_name = f"{current_user.id}_avatar_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{avatar_filename}"
+                avatar_name = f"{current_user.id}_avatar_{uuid.uuid4().hex}_{avatar_filename}"
                 local_path = os.path.join(LOCAL_UPLOAD_FOLDER, avatar_name)
                 # save processed image to local uploads
                 img = Image.open(avatar_file)
+                if img.format == 'JPEG':
+                    img.draft('RGB', (400, 400))
                 if img.mode != 'RGB': img = img.convert('RGB')
-                img.thumbnail((400, 400))
+                img.thumbnail((400, 400), Image.Resampling.LANCZOS)
                 img.save(local_path, format='JPEG', optimize=True, quality=85)
                 # store filename (templates expect filenames for static/uploads)
                 current_user.avatar = avatar_name
@@ -358,6 +995,7 @@ def edit_profile():
                 flash(f"Avatar Upload Error: {e}", 'danger')
 
         db.session.commit()
+        evict_cached_user(current_user.id)
         flash('Profile updated!', 'success')
         return redirect(url_for('profile', username=current_user.username))
     return render_template('edit_profile.html')
@@ -380,6 +1018,7 @@ def remove_avatar():
                     pass
                 current_user.avatar = None
             db.session.commit()
+            evict_cached_user(current_user.id)
             flash('Profile photo removed.', 'success')
     except Exception as e:
         flash(f'Error removing avatar: {e}', 'danger')
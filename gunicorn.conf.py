@@ -0,0 +1,7 @@
+# Gunicorn isko working directory se khud load karta hai (Docker CMD aur Azure App Service dono)
+import os
+
+# Threaded workers: ek worker Azure/DB I/O par ruke bina kai requests handle karta hai
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
@@ -12,14 +12,18 @@ followers = db.Table('followers',
 
 class Like(db.Model):
     __tablename__ = 'likes'
+    # Primary key (user_id, photo_id) "has this user ..." lookups cover karta hai;
+    # photo_id index per-photo lookups (counts, joins) ke liye hai
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
-    photo_id = db.Column(db.Integer, db.ForeignKey('photo.id'), primary_key=True)
+    photo_id = db.Column(db.Integer, db.ForeignKey('photo.id'), primary_key=True, index=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Save(db.Model):
     __tablename__ = 'saves'
+    # Primary key (user_id, photo_id) "has this user ..." lookups cover karta hai;
+    # photo_id index per-photo lookups (counts, joins) ke liye hai
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
-    photo_id = db.Column(db.Integer, db.ForeignKey('photo.id'), primary_key=True)
+    photo_id = db.Column(db.Integer, db.ForeignKey('photo.id'), primary_key=True, index=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Comment(db.Model):
@@ -69,6 +73,16 @@ class Photo(db.Model):
     
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    # Denormalized counters: likes/saves write-behind flush mein, comments add_comment mein update hote hain
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    save_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # 'processing' jab tak background worker upload store na kar de, phir 'ready' (ya 'failed')
+    status = db.Column(db.String(20), nullable=False, default='ready', server_default='ready')
+    # Uploaded file ki BLAKE2b hash; same content dobara aaye to auto_tags reuse hote hain
+    content_hash = db.Column(db.String(32), index=True)
     
     creator = db.relationship('User', backref='photos')
     likes = db.relationship('Like', backref='photo', lazy='dynamic')
@@ -78,4 +92,10 @@ class Photo(db.Model):
     def is_liked_by(self, user):
         return self.likes.filter_by(user_id=user.id).count() > 0
     def is_saved_by(self, user):
-        return self.saves.filter_by(user_id=user.id).count() > 0
\ No newline at end of file
+        return self.saves.filter_by(user_id=user.id).count() > 0
+
+# Profile grid: WHERE user_id = ? ORDER BY uploaded_at DESC
+db.Index('ix_photo_user_uploaded', Photo.user_id, Photo.uploaded_at.desc())
+
+# Feed keyset pagination: ORDER BY uploaded_at DESC, id DESC
+db.Index('ix_photo_uploaded_id', Photo.uploaded_at.desc(), Photo.id.desc())
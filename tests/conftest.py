@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py import par hi DB connect karta hai, is liye env pehle set karo
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ.pop('AZURE_STORAGE_CONNECTION_STRING', None)
+# N+1 detector sirf debug mein lagta hai; tests mein lazy-load regressions fail hon
+os.environ['FLASK_DEBUG'] = '1'
+os.environ['NPLUSONE_RAISE'] = '1'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as photoshare  # noqa: E402
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.setattr(photoshare, 'LOCAL_UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(photoshare, 'container_client', None)
+    photoshare.app.config['TESTING'] = True
+    yield photoshare
+    photoshare._user_cache.clear()
+    with photoshare.app.app_context():
+        photoshare.db.drop_all()
+        photoshare.db.create_all()
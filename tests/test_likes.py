@@ -0,0 +1,74 @@
+import time
+
+from models import Photo, User
+
+
+def login_consumer_with_photo(app_module):
+    client = app_module.app.test_client()
+    with app_module.app.app_context():
+        creator = User(username='creator', password=app_module.hash_password('pw'), role='creator')
+        app_module.db.session.add(creator)
+        app_module.db.session.flush()
+        photo = Photo(filename='x.jpg', title='t', user_id=creator.id)
+        app_module.db.session.add(photo)
+        app_module.db.session.commit()
+        photo_id = photo.id
+    client.post('/register', data={'username': 'fan', 'password': 'pw', 'role': 'consumer'})
+    client.post('/login', data={'username': 'fan', 'password': 'pw', 'role': 'consumer'})
+    return client, photo_id
+
+
+def test_like_unlike_within_flush_window_keeps_count_consistent(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'WRITE_BEHIND_INTERVAL', 0.5)
+    client, photo_id = login_consumer_with_photo(app_module)
+
+    assert client.post(f'/like/{photo_id}').get_json() == {'liked': True, 'count': 1}
+    assert client.post(f'/like/{photo_id}').get_json() == {'liked': False, 'count': 0}
+    assert client.post(f'/like/{photo_id}').get_json() == {'liked': True, 'count': 1}
+
+    time.sleep(1)
+    with app_module.app.app_context():
+        assert app_module.db.session.get(Photo, photo_id).like_count == 1
+    assert client.post(f'/like/{photo_id}').get_json() == {'liked': False, 'count': 0}
+    time.sleep(1)
+
+
+def test_like_missing_photo_is_404(app_module):
+    client, photo_id = login_consumer_with_photo(app_module)
+    assert client.post(f'/like/{photo_id + 100}').status_code == 404
+
+
+def test_failed_flush_is_retried_not_dropped(app_module, monkeypatch):
+    client, photo_id = login_consumer_with_photo(app_module)
+    real_flush = app_module.flush_writes
+    calls = []
+
+    def flaky_flush(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError('database went away')
+        return real_flush(batch)
+
+    monkeypatch.setattr(app_module, 'flush_writes', flaky_flush)
+    assert client.post(f'/like/{photo_id}').get_json() == {'liked': True, 'count': 1}
+    time.sleep(1)
+
+    assert len(calls) >= 2
+    with app_module.app.app_context():
+        assert app_module.db.session.get(Photo, photo_id).like_count == 1
+        assert app_module.db.session.query(app_module.Like).count() == 1
+    assert not app_module._pending_writes
+
+
+def test_exit_flush_writes_batch_held_by_worker(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'WRITE_BEHIND_INTERVAL', 0.5)
+    client, photo_id = login_consumer_with_photo(app_module)
+    client.post(f'/like/{photo_id}')
+    time.sleep(0.1)  # worker ne item queue se utha liya hai aur sleep kar raha hai
+    assert app_module._write_queue.empty()
+
+    app_module._flush_pending_writes()
+
+    assert not app_module._write_thread.is_alive()
+    with app_module.app.app_context():
+        assert app_module.db.session.get(Photo, photo_id).like_count == 1
@@ -0,0 +1,54 @@
+import pytest
+
+from models import Comment, Like, Photo, Save, User
+
+
+def login(app_module, username, role):
+    client = app_module.app.test_client()
+    client.post('/register', data={'username': username, 'password': 'pw', 'role': role})
+    client.post('/login', data={'username': username, 'password': 'pw', 'role': role})
+    return client
+
+
+def seed_feed(app_module):
+    """Teen creators, har ek ki do photos, aur har photo par teen alag users ke comments."""
+    db = app_module.db
+    fan = login(app_module, 'fan', 'consumer')
+    with app_module.app.app_context():
+        fan_id = User.query.filter_by(username='fan').one().id
+        commenters = [User(username=f'commenter{i}', password='x', role='consumer') for i in range(3)]
+        creators = [User(username=f'creator{i}', password='x', role='creator') for i in range(3)]
+        db.session.add_all(commenters + creators)
+        db.session.flush()
+        for creator in creators:
+            for n in range(2):
+                photo = Photo(filename=f'{creator.username}_{n}.jpg', title=f'{creator.username} {n}', user_id=creator.id)
+                db.session.add(photo)
+                db.session.flush()
+                db.session.add_all(Comment(text='nice [AI: Positive]', user_id=c.id, photo_id=photo.id)
+                                   for c in commenters)
+                db.session.add_all([Like(user_id=fan_id, photo_id=photo.id), Save(user_id=fan_id, photo_id=photo.id)])
+        db.session.commit()
+    return fan
+
+
+def test_debug_detector_is_enabled_in_tests(app_module):
+    assert app_module.app.debug
+    assert app_module.NPLUSONE_RAISE
+
+
+def test_feed_and_profile_have_no_lazy_loads(app_module):
+    fan = seed_feed(app_module)
+    feed = fan.get('/feed')
+    assert feed.status_code == 200
+    assert feed.data.count(b'commenter2') == 6
+    profile = fan.get('/u/fan')
+    assert profile.status_code == 200
+
+
+def test_lazy_loop_raises(app_module):
+    seed_feed(app_module)
+    with app_module.app.test_request_context('/'):
+        with pytest.raises(app_module.NPlusOneError, match='Photo -> User'):
+            for photo in Photo.query.all():
+                photo.creator.username
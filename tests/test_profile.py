@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, update
+
+from models import Like, Photo, Save, User
+
+
+def login(app_module, username, role):
+    client = app_module.app.test_client()
+    client.post('/register', data={'username': username, 'password': 'pw', 'role': role})
+    client.post('/login', data={'username': username, 'password': 'pw', 'role': role})
+    return client
+
+
+def test_profile_tabs_include_rows_with_null_timestamps(app_module):
+    db = app_module.db
+    client = login(app_module, 'fan', 'consumer')
+    creator_client = login(app_module, 'creator', 'creator')
+    with app_module.app.app_context():
+        creator = User.query.filter_by(username='creator').one()
+        now = datetime.utcnow()
+        old = Photo(filename='old.jpg', title='Old shot', user_id=creator.id, uploaded_at=now - timedelta(days=1))
+        new = Photo(filename='new.jpg', title='New shot', user_id=creator.id, uploaded_at=now)
+        db.session.add_all([old, new])
+        db.session.flush()
+        fan = User.query.filter_by(username='fan').one()
+        db.session.add_all([Save(user_id=fan.id, photo_id=old.id),
+                            Like(user_id=fan.id, photo_id=new.id, timestamp=now)])
+        db.session.flush()
+        # Purani rows mein timestamp NULL ho sakta hai; tab membership phir bhi bani rahe
+        db.session.execute(update(Save).values(timestamp=None))
+        db.session.commit()
+
+    captured = {}
+
+    def capture(photos, saved_photos, liked_photos, **kwargs):
+        captured.update(photos=photos, saved=saved_photos, liked=liked_photos)
+
+    from flask import template_rendered
+    with template_rendered.connected_to(lambda sender, template, context, **kw: capture(**context)):
+        assert creator_client.get('/u/creator').status_code == 200
+        assert [p.title for p in captured['photos']] == ['New shot', 'Old shot']
+        assert client.get('/u/fan').status_code == 200
+        assert [p.title for p in captured['saved']] == ['Old shot']
+        assert [p.title for p in captured['liked']] == ['New shot']
+        assert captured['photos'] == []
+
+
+def test_profile_tabs_use_indexed_branches(app_module):
+    client = login(app_module, 'fan', 'consumer')
+    statements = []
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append((statement, params))
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        client.get('/u/fan')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    statement, params = next(s for s in statements if 'UNION ALL' in s[0])
+    with app_module.app.app_context():
+        plan = ' '.join(row[3] for row in app_module.db.session.connection()
+                        .exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, params))
+    assert 'ix_photo_user_uploaded' in plan
+    assert 'SCAN photo' not in plan
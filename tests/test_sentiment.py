@@ -0,0 +1,49 @@
+import random
+
+import pytest
+from textblob import TextBlob
+
+PHRASES = [
+    'good',
+    'very good',
+    'not good',
+    'not very good',
+    'not very nice',
+    'not very interesting',
+    'never very good',
+    'no very good photo',
+    'really not good',
+    'this is not a very good shot',
+    'terribly bad lighting',
+    'amazing!',
+    'meh :(',
+    'great shot :)',
+    'so sad :-(',
+    'love it <3',
+    'very :{ deluxe',
+    'annoying open-minded',
+    'great-looking and open-minded',
+    'top-notch work!',
+    'the 2nd best',
+]
+
+
+@pytest.mark.parametrize('text', PHRASES)
+def test_polarity_matches_textblob(app_module, text):
+    assert app_module.comment_polarity(text) == pytest.approx(TextBlob(text).sentiment.polarity, abs=1e-9)
+
+
+def test_negated_adverb_is_not_blocked(app_module):
+    # TextBlob ~ -0.27: Negative tag ke saath post hota hai, block nahi
+    assert -0.3 < app_module.comment_polarity('not very good') < 0
+
+
+def test_polarity_matches_textblob_on_random_lexicon_phrases(app_module):
+    rng = random.Random(7)
+    words = sorted(w for w in app_module.get_sentiment_lexicon() if ' ' not in w and "'" not in w)
+    emoticons = sorted(app_module.SENTIMENT_EMOTICONS)
+    glue = ['not', 'no', 'never', 'very', 'really', 'a', 'the', 'photo', '!', 'is']
+    for _ in range(500):
+        text = ' '.join(rng.choice(rng.choice([words, words, emoticons, glue, glue]))
+                        for _ in range(rng.randint(1, 6)))
+        assert app_module.comment_polarity(text) == pytest.approx(TextBlob(text).sentiment.polarity, abs=1e-9), text
@@ -0,0 +1,130 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+from models import Photo, User
+
+
+class InlineExecutor:
+    """upload_executor ki jagah: job request ke andar hi chalta hai."""
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def make_creator(app_module):
+    with app_module.app.app_context():
+        creator = User(username='creator', password=app_module.hash_password('pw'), role='creator')
+        app_module.db.session.add(creator)
+        app_module.db.session.commit()
+        return creator.id
+
+
+def make_processing_photo(app_module, user_id, **kwargs):
+    with app_module.app.app_context():
+        photo = Photo(filename='pending.jpg', title='t', user_id=user_id, status='processing', **kwargs)
+        app_module.db.session.add(photo)
+        app_module.db.session.commit()
+        return photo.id
+
+
+def image_bytes(fmt, size=(1600, 1200)):
+    buf = io.BytesIO()
+    Image.new('RGB', size, (30, 90, 200)).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('data', [image_bytes('JPEG'), image_bytes('PNG', size=(500, 400))], ids=['jpeg', 'png'])
+def test_process_upload_marks_ready_and_removes_temp_file(app_module, tmp_path, data):
+    photo_id = make_processing_photo(app_module, make_creator(app_module))
+    tmp_file = tmp_path / 'upload_tmp'
+    tmp_file.write_bytes(data)
+
+    app_module.process_upload(photo_id, str(tmp_file), 'stored.jpg')
+
+    assert not tmp_file.exists()
+    with app_module.app.app_context():
+        photo = app_module.db.session.get(Photo, photo_id)
+        assert photo.status == 'ready'
+        assert photo.auto_tags and photo.content_hash
+    with Image.open(os.path.join(app_module.LOCAL_UPLOAD_FOLDER, 'stored.jpg')) as stored:
+        assert stored.format == 'JPEG'
+        assert max(stored.size) <= 1080
+
+
+def test_process_upload_marks_truncated_jpeg_failed(app_module, tmp_path):
+    photo_id = make_processing_photo(app_module, make_creator(app_module))
+    tmp_file = tmp_path / 'upload_tmp'
+    tmp_file.write_bytes(image_bytes('JPEG')[:2000])
+
+    app_module.process_upload(photo_id, str(tmp_file), 'stored.jpg')
+
+    assert not tmp_file.exists()
+    with app_module.app.app_context():
+        assert app_module.db.session.get(Photo, photo_id).status == 'failed'
+
+
+def login_creator(app_module):
+    client = app_module.app.test_client()
+    client.post('/register', data={'username': 'creator', 'password': 'pw', 'role': 'creator'})
+    client.post('/login', data={'username': 'creator', 'password': 'pw', 'role': 'creator'})
+    return client
+
+
+def test_upload_rejects_non_image_before_creating_row(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'upload_executor', InlineExecutor())
+    client = login_creator(app_module)
+
+    response = client.post('/upload', data={'photo': (io.BytesIO(b'not an image'), 'x.jpg'), 'title': 't'},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert b'Upload Error' in response.data
+    with app_module.app.app_context():
+        assert Photo.query.count() == 0
+
+
+def test_upload_route_processes_photo(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'upload_executor', InlineExecutor())
+    client = login_creator(app_module)
+
+    response = client.post('/upload', data={'photo': (io.BytesIO(image_bytes('JPEG')), 'x.jpg'), 'title': 't'},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 302
+    with app_module.app.app_context():
+        photo = Photo.query.one()
+        assert photo.status == 'ready'
+        assert os.path.exists(os.path.join(app_module.LOCAL_UPLOAD_FOLDER, photo.filename.rsplit('/', 1)[1]))
+
+
+def test_feed_hides_photos_that_are_not_ready(app_module):
+    creator_id = make_creator(app_module)
+    with app_module.app.app_context():
+        db = app_module.db
+        db.session.add_all([Photo(filename=f'{status}.jpg', title=f'{status} shot', user_id=creator_id, status=status)
+                            for status in ('ready', 'processing', 'failed')])
+        db.session.commit()
+    client = app_module.app.test_client()
+    client.post('/register', data={'username': 'fan', 'password': 'pw', 'role': 'consumer'})
+    client.post('/login', data={'username': 'fan', 'password': 'pw', 'role': 'consumer'})
+
+    page = client.get('/feed').data
+
+    assert b'ready shot' in page
+    assert b'processing shot' not in page
+    assert b'failed shot' not in page
+
+
+def test_startup_fails_stale_processing_uploads(app_module):
+    creator_id = make_creator(app_module)
+    old = datetime.utcnow() - timedelta(minutes=app_module.STALE_UPLOAD_MINUTES + 5)
+    stale_id = make_processing_photo(app_module, creator_id, uploaded_at=old)
+    fresh_id = make_processing_photo(app_module, creator_id)
+
+    with app_module.app.app_context():
+        assert app_module.fail_stale_uploads() == 1
+        assert app_module.db.session.get(Photo, stale_id).status == 'failed'
+        assert app_module.db.session.get(Photo, fresh_id).status == 'processing'
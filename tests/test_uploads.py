@@ -0,0 +1,44 @@
+import os
+
+from PIL import Image
+
+
+def make_geotagged_jpeg(path, size=(800, 600)):
+    exif = Image.Exif()
+    exif[271] = 'Canon'  # Make
+    exif[34853] = {1: 'N', 2: (33.0, 41.0, 0.0), 3: 'E', 4: (73.0, 3.0, 0.0)}  # GPS IFD
+    Image.new('RGB', size, (120, 80, 40)).save(path, format='JPEG', exif=exif)
+
+
+def test_small_geotagged_jpeg_is_stored_without_exif(app_module, tmp_path):
+    src = str(tmp_path / 'upload.jpg')
+    make_geotagged_jpeg(src)
+    assert Image.open(src).getexif()  # fixture sach mein geotagged hai
+
+    app_module.store_image(src, 'stored.jpg')
+
+    with Image.open(os.path.join(app_module.LOCAL_UPLOAD_FOLDER, 'stored.jpg')) as stored:
+        assert stored.size == (800, 600)
+        assert not stored.info.get('exif')
+        assert not stored.getexif()
+
+
+def test_small_jpeg_without_metadata_is_stored_as_is(app_module, tmp_path):
+    src = str(tmp_path / 'upload.jpg')
+    Image.new('RGB', (800, 600), (120, 80, 40)).save(src, format='JPEG', quality=70)
+
+    app_module.store_image(src, 'stored.jpg')
+
+    with open(src, 'rb') as original, open(os.path.join(app_module.LOCAL_UPLOAD_FOLDER, 'stored.jpg'), 'rb') as stored:
+        assert original.read() == stored.read()
+
+
+def test_small_cmyk_jpeg_is_converted_to_rgb(app_module, tmp_path):
+    src = str(tmp_path / 'cmyk.jpg')
+    Image.new('CMYK', (800, 600), (0, 100, 200, 0)).save(src, format='JPEG')
+
+    app_module.store_image(src, 'stored.jpg')
+
+    with Image.open(os.path.join(app_module.LOCAL_UPLOAD_FOLDER, 'stored.jpg')) as stored:
+        assert stored.mode == 'RGB'
+        assert stored.size == (800, 600)
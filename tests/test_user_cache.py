@@ -0,0 +1,44 @@
+from cachetools import TTLCache
+from sqlalchemy import update
+
+from models import User
+
+
+def register(app_module, username):
+    client = app_module.app.test_client()
+    client.post('/register', data={'username': username, 'password': 'pw', 'role': 'consumer'})
+    client.post('/login', data={'username': username, 'password': 'pw', 'role': 'consumer'})
+    with app_module.app.app_context():
+        return client, User.query.filter_by(username=username).one().id
+
+
+def test_cached_user_expires_after_ttl(app_module, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(app_module, '_user_cache', TTLCache(maxsize=1024, ttl=60, timer=lambda: now[0]))
+    client, user_id = register(app_module, 'alice')
+    client.get('/edit_profile')
+    assert user_id in app_module._user_cache
+
+    # Doosra worker/instance bio badalta hai: is process ki cache usse evict nahi karti
+    with app_module.app.app_context():
+        app_module.db.session.execute(update(User).where(User.id == user_id).values(bio='from another worker'))
+        app_module.db.session.commit()
+    assert app_module._user_cache[user_id].bio != 'from another worker'
+
+    now[0] += 61
+    with app_module.app.test_request_context():
+        assert app_module.load_user(str(user_id)).bio == 'from another worker'
+
+
+def test_profile_edit_evicts_only_that_user(app_module):
+    alice, alice_id = register(app_module, 'alice')
+    bob, bob_id = register(app_module, 'bob')
+    alice.get('/edit_profile')
+    bob.get('/edit_profile')
+    assert {alice_id, bob_id} <= set(app_module._user_cache)
+
+    alice.post('/edit_profile', data={'bio': 'new bio'})
+
+    assert alice_id not in app_module._user_cache
+    assert bob_id in app_module._user_cache
+    assert b'new bio' in alice.get('/edit_profile').data